@@ -1,11 +1,20 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 import numpy as np
+import io
 import os
+import struct
+import json
+import threading
 from pathlib import Path
 import cv2
 import tensorflow as tf
 from dotenv import load_dotenv
 
+try:
+    import msgpack
+except ImportError:  # optional: only needed for msgpack responses
+    msgpack = None
+
 load_dotenv()
 
 # Model + threshold (can be overridden with env vars in Docker/cloud)
@@ -13,6 +22,26 @@ DEFAULT_MODEL_PATH = Path(__file__).resolve().parent / \
     "model" / "brain_mri_model.h5"
 MODEL_PATH = os.getenv("MODEL_PATH", str(DEFAULT_MODEL_PATH))
 THRESHOLD = float(os.getenv("THRESHOLD", "0.05"))
+IMG_SIZE = (28, 28)
+
+# Compact binary formats, picked via Content-Type (request) and Accept
+# (response). The multipart + JSON path used by the web UI is unchanged.
+JSON_MIMETYPE = "application/json"
+NPY_MIMETYPE = "application/x-npy"
+RAW_MIMETYPE = "application/octet-stream"
+MSGPACK_MIMETYPE = "application/msgpack"
+TENSOR_DTYPES = ("uint8", "float32")
+# msgpack is only offered when installed, so negotiation falls back to JSON
+RESPONSE_MIMETYPES = [JSON_MIMETYPE, NPY_MIMETYPE] + (
+    [MSGPACK_MIMETYPE] if msgpack is not None else [])
+# Raw body layout: dtype name (ASCII, NUL-padded), N, H, W as little-endian
+# uint32, followed by N*H*W pixels in C order.
+RAW_HEADER = struct.Struct("<8sIII")
+
+# Drift monitoring: reference profile written by training/evaluate_model.py
+DEFAULT_PROFILE_PATH = Path(MODEL_PATH).parent / "reference_profile.json"
+DRIFT_PROFILE_PATH = os.getenv("DRIFT_PROFILE_PATH", str(DEFAULT_PROFILE_PATH))
+DRIFT_PSI_ALERT = float(os.getenv("DRIFT_PSI_ALERT", "0.2"))
 
 app = Flask(__name__)
 
@@ -32,16 +61,155 @@ if not os.path.exists(MODEL_PATH):
 model = tf.keras.models.load_model(MODEL_PATH, compile=False)
 
 
+class DriftMonitor:
+    """Streaming fixed-bin histograms of served predictions and inputs.
+
+    Bins come from the reference profile, so memory is constant per worker
+    no matter how many requests are served.
+    """
+
+    def __init__(self, profile):
+        features = profile["features"]
+        self.reference_count = int(profile.get("count", 0))
+        self.edges = {k: np.asarray(f["edges"], dtype="float64")
+                      for k, f in features.items()}
+        self.reference = {k: np.asarray(f["counts"], dtype="float64")
+                          for k, f in features.items()}
+        self.counts = {k: np.zeros(len(e) - 1, dtype=np.int64)
+                       for k, e in self.edges.items()}
+        self.seen = 0
+        self.lock = threading.Lock()
+
+    def update(self, features):
+        """Add one batch; ``features`` maps name -> per-image values."""
+        with self.lock:
+            for name, values in features.items():
+                edges = self.edges.get(name)
+                if edges is None:
+                    continue
+                idx = np.searchsorted(edges, values, side="right") - 1
+                np.clip(idx, 0, len(edges) - 2, out=idx)
+                np.add.at(self.counts[name], idx, 1)
+            self.seen += len(features["probability_tumor"])
+
+    def scores(self):
+        with self.lock:
+            counts = {k: c.copy() for k, c in self.counts.items()}
+            seen = self.seen
+        out = {}
+        for name, observed in counts.items():
+            out[name] = drift_scores(self.reference[name], observed)
+        return seen, out
+
+
+def drift_scores(reference, observed, eps=1e-4):
+    """PSI and KS (max CDF gap) between two binned distributions."""
+    if observed.sum() == 0 or reference.sum() == 0:
+        return {"psi": None, "ks": None}
+    p = np.maximum(reference / reference.sum(), eps)
+    q = np.maximum(observed / observed.sum(), eps)
+    psi = float(np.sum((q - p) * np.log(q / p)))
+    ks = float(np.max(np.abs(np.cumsum(reference) / reference.sum()
+                             - np.cumsum(observed) / observed.sum())))
+    return {"psi": psi, "ks": ks}
+
+
+# The monitor is optional: without a reference profile /drift reports it
+# as disabled and predict() skips the bookkeeping.
+drift_monitor = None
+if os.path.exists(DRIFT_PROFILE_PATH):
+    with open(DRIFT_PROFILE_PATH) as f:
+        drift_monitor = DriftMonitor(json.load(f))
+
+
 
 def preprocess(file_bytes):
     arr = np.frombuffer(file_bytes, np.uint8)
     img = cv2.imdecode(arr, cv2.IMREAD_GRAYSCALE)
     if img is None:
         raise ValueError("Unable to decode image")
-    img = cv2.resize(img, (28, 28))
+    dims = img.shape
+    if img.shape != IMG_SIZE:  # already-reduced uploads skip the resize
+        img = cv2.resize(img, IMG_SIZE)
     img = img.astype("float32")/255.0
     img = np.expand_dims(img, axis=(0, -1))  # (1,28,28,1)
-    return img
+    return img, dims
+
+
+def decode_tensor(body, mimetype):
+    """Parse an .npy or length-prefixed raw body into an (N,H,W) array."""
+    if mimetype == NPY_MIMETYPE:
+        try:
+            arr = np.load(io.BytesIO(body), allow_pickle=False)
+        except (ValueError, OSError, EOFError) as e:
+            raise ValueError(f"Invalid .npy body: {e}")
+        if not isinstance(arr, np.ndarray):  # e.g. an .npz archive
+            raise ValueError("Expected a single .npy array, not an archive")
+        return arr
+    if len(body) < RAW_HEADER.size:
+        raise ValueError("Binary body shorter than its header")
+    dtype, n, h, w = RAW_HEADER.unpack_from(body)
+    dtype = dtype.rstrip(b"\0").decode("ascii", "replace")
+    if dtype not in TENSOR_DTYPES:
+        raise ValueError(f"Unsupported dtype {dtype!r}; use one of {TENSOR_DTYPES}")
+    dtype = np.dtype(dtype).newbyteorder("<")
+    payload = memoryview(body)[RAW_HEADER.size:]
+    if len(payload) != n * h * w * dtype.itemsize:
+        raise ValueError(
+            f"Expected {n * h * w * dtype.itemsize} payload bytes for "
+            f"shape ({n},{h},{w}), got {len(payload)}")
+    return np.frombuffer(payload, dtype=dtype).reshape(n, h, w)
+
+
+def preprocess_tensor(arr):
+    """(N,H,W) or (H,W) pixel array -> (N,28,28,1) float32 in [0, 1]."""
+    if arr.ndim == 2:
+        arr = arr[np.newaxis]
+    if arr.ndim != 3 or 0 in arr.shape:
+        raise ValueError(f"Expected shape (N,H,W), got {arr.shape}")
+    if arr.dtype.name not in TENSOR_DTYPES:
+        raise ValueError(
+            f"Unsupported dtype {arr.dtype}; use one of {TENSOR_DTYPES}")
+    # cv2 ignores byte order, so e.g. a big-endian '>f4' .npy must be swapped
+    arr = arr.astype(arr.dtype.newbyteorder("="), copy=False)
+    if arr.dtype != np.uint8 and not (
+            np.isfinite(arr).all() and arr.min() >= 0.0 and arr.max() <= 1.0):
+        raise ValueError("float32 pixels must be finite and within [0, 1]")
+    if arr.shape[1:] != IMG_SIZE:
+        arr = np.stack([cv2.resize(np.ascontiguousarray(img), IMG_SIZE)
+                        for img in arr])
+    x = arr.astype("float32")
+    if arr.dtype == np.uint8:
+        x /= 255.0
+    return x[..., np.newaxis]
+
+
+def prediction_response(probs, batch):
+    """Encode probabilities in the format the client asked for via Accept."""
+    label_ids = (probs >= THRESHOLD).astype(np.uint8)
+    fmt = request.accept_mimetypes.best_match(RESPONSE_MIMETYPES)
+    if fmt == NPY_MIMETYPE:
+        buf = io.BytesIO()
+        np.save(buf, probs.astype("<f4"), allow_pickle=False)
+        return Response(buf.getvalue(), mimetype=NPY_MIMETYPE,
+                        headers={"X-Threshold": str(THRESHOLD)})
+    if fmt == MSGPACK_MIMETYPE:
+        body = msgpack.packb({
+            "probability_tumor": probs.tolist(),
+            "label_id": label_ids.tolist(),
+            "threshold": THRESHOLD,
+        }, use_single_float=True)
+        return Response(body, mimetype=MSGPACK_MIMETYPE)
+
+    predictions = [{
+        "probability_tumor": float(p),
+        "threshold": THRESHOLD,
+        "label_id": int(i),
+        "label_name": "tumor" if i == 1 else "no_tumor"
+    } for p, i in zip(probs, label_ids)]
+    if batch:
+        return jsonify({"threshold": THRESHOLD, "predictions": predictions})
+    return jsonify(predictions[0])
 
 
 GTM_ID = os.getenv("GTM_ID")  # e.g., GTM-ABC1234
@@ -56,21 +224,85 @@ def health():
     return jsonify({"status": "ok"})
 
 
-@app.post("/predict")
-def predict():
-    if "file" not in request.files:
-        return jsonify({"error": 'Missing form field "file"'}), 400
-    x = preprocess(request.files["file"].read())
-    proba = float(model.predict(x, verbose=0).reshape(-1)[0])
-    label_id = 1 if proba >= THRESHOLD else 0
-    label = "tumor" if label_id == 1 else "no_tumor"
+@app.get("/drift")
+def drift():
+    if drift_monitor is None:
+        return jsonify({"enabled": False, "profile": DRIFT_PROFILE_PATH})
+    seen, scores = drift_monitor.scores()
+    psis = [s["psi"] for s in scores.values() if s["psi"] is not None]
     return jsonify({
-        "probability_tumor": proba,
-        "threshold": THRESHOLD,
-        "label_id": label_id,
-        "label_name": label
+        "enabled": True,
+        "profile": DRIFT_PROFILE_PATH,
+        "reference_count": drift_monitor.reference_count,
+        "observed_count": seen,
+        "psi_alert": DRIFT_PSI_ALERT,
+        "alert": bool(psis) and max(psis) >= DRIFT_PSI_ALERT,
+        "features": scores,
     })
 
 
+def original_dims(default=None):
+    """(H, W) of the image before any client-side downscaling, if known."""
+    # index.js reports the pre-reduction size as "WxH"
+    size = request.headers.get("X-Original-Size", "")
+    w, _, h = size.partition("x")
+    if w.isdigit() and h.isdigit():
+        return int(h), int(w)
+    return default
+
+
+def client_area_reduced():
+    """Whether the client says it shrank the image with area averaging."""
+    # A 28x28 tensor alone doesn't say how it was made (index.js reproduces
+    # the server's bilinear resize), so only this explicit opt-in counts.
+    resample = request.headers.get("X-Client-Resample", "")
+    return resample.strip().lower() == "area"
+
+
+def record_drift(x, probs, dims):
+    """Feed one request into the drift monitor.
+
+    Inputs the client reduced with area averaging (``X-Client-Resample:
+    area``) go to separate ``*_reduced`` intensity histograms instead of
+    being compared with the server-resized reference. Height and width are
+    only recorded when the original size is known.
+    """
+    if drift_monitor is None:
+        return
+    suffix = "_reduced" if client_area_reduced() else ""
+    features = {
+        "probability_tumor": probs,
+        "label_id": (probs >= THRESHOLD).astype("float32"),
+        "mean_intensity" + suffix: x.mean(axis=(1, 2, 3)),
+        "std_intensity" + suffix: x.std(axis=(1, 2, 3)),
+    }
+    dims = original_dims(dims)
+    if dims is not None:
+        features["height"] = np.full(len(probs), dims[0], dtype="float32")
+        features["width"] = np.full(len(probs), dims[1], dtype="float32")
+    drift_monitor.update(features)
+
+
+@app.post("/predict")
+def predict():
+    # Pixel tensors (.npy or raw) skip image decoding entirely; anything
+    # else goes through the original multipart upload path.
+    batch = request.mimetype in (NPY_MIMETYPE, RAW_MIMETYPE)
+    try:
+        if batch:
+            arr = decode_tensor(request.get_data(), request.mimetype)
+            x = preprocess_tensor(arr)
+            dims = None  # tensor shape says nothing about the original scan
+        elif "file" not in request.files:
+            return jsonify({"error": 'Missing form field "file"'}), 400
+        else:
+            x, dims = preprocess(request.files["file"].read())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    probs = model.predict(x, verbose=0).reshape(-1).astype("float32")
+    record_drift(x, probs, dims)
+    return prediction_response(probs, batch)
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
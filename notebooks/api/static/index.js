@@ -46,6 +46,17 @@ const toast = toastEl ? new bootstrap.Toast(toastEl) : null
 /* ============================== Config =============================== */
 const MAX_MB = 10
 const ACCEPTED = ['image/jpeg', 'image/png']
+// The model only sees a 28x28 grayscale slice, so the browser can reduce the
+// image before upload. The reduction is done in JS, bit-exact with the
+// server's cv2 grayscale + INTER_LINEAR resize (no canvas smoothing), and
+// training/check_client_downscale.py runs the same port on the test set.
+// Off until that check is recorded within tolerance in
+// training/eval_final/client_downscale.json; until then the original file
+// is uploaded as multipart.
+const CLIENT_DOWNSCALE = false
+const UPLOAD_SIZE = 28
+// Raw tensor header (see README "API"): dtype name, then N, H, W as uint32 LE
+const RAW_HEADER_BYTES = 20
 
 /* ============================ Analytics ============================= */
 function gaEvent(name, params) {
@@ -64,6 +75,102 @@ function humanSize(bytes) {
   const sizes = ['B', 'KB', 'MB', 'GB']
   return (bytes / Math.pow(1024, i)).toFixed(1) + ' ' + sizes[i]
 }
+
+/* ===================== Client-side downscaling ====================== */
+// Round half to even, like cvRound / saturate_cast<short>
+function roundEven(v) {
+  const r = Math.round(v)
+  return Math.abs(v % 1) === 0.5 && r % 2 !== 0 ? r - 1 : r
+}
+
+/**
+ * Source indices and 11-bit fixed-point weights of cv2 INTER_LINEAR along one
+ * axis: src = (dst + 0.5) * scale - 0.5 in float32. cv2 clamps the weights at
+ * the borders horizontally but replicates border rows vertically.
+ */
+function linearTaps(ssize, dsize, clampWeights) {
+  const scale = 1 / (dsize / ssize)
+  const taps = []
+  for (let d = 0; d < dsize; d++) {
+    let f = Math.fround((d + 0.5) * scale - 0.5)
+    let s = Math.floor(f)
+    f = Math.fround(f - s)
+    let s1 = s + 1
+    if (clampWeights) {
+      if (s < 0) (s = 0), (f = 0)
+      if (s >= ssize - 1) (s = ssize - 1), (f = 0)
+      s1 = Math.min(s + 1, ssize - 1)
+    } else {
+      s = Math.min(Math.max(s, 0), ssize - 1)
+      s1 = Math.min(Math.max(s1, 0), ssize - 1)
+    }
+    taps.push([s, s1, roundEven(Math.fround(1 - f) * 2048), roundEven(f * 2048)])
+  }
+  return taps
+}
+
+/**
+ * cv2.cvtColor(BGR2GRAY) + cv2.resize(INTER_LINEAR) on RGBA pixels, with
+ * cv2's fixed-point arithmetic so the result matches the server exactly.
+ */
+function grayResizeLinear(rgba, sw, sh, dw, dh) {
+  const gray = new Int32Array(sw * sh)
+  for (let i = 0; i < gray.length; i++) {
+    const o = i * 4
+    gray[i] =
+      (rgba[o] * 9798 + rgba[o + 1] * 19235 + rgba[o + 2] * 3735 + 16384) >> 15
+  }
+  const xs = linearTaps(sw, dw, true)
+  const ys = linearTaps(sh, dh, false)
+  const out = new Uint8Array(dw * dh)
+  const hrow = (r, x) => {
+    const [x0, x1, a0, a1] = xs[x]
+    return gray[r * sw + x0] * a0 + gray[r * sw + x1] * a1
+  }
+  for (let y = 0; y < dh; y++) {
+    const [r0, r1, b0, b1] = ys[y]
+    for (let x = 0; x < dw; x++) {
+      const v =
+        (((b0 * (hrow(r0, x) >> 4)) >> 16) +
+          ((b1 * (hrow(r1, x) >> 4)) >> 16) +
+          2) >>
+        2
+      out[y * dw + x] = Math.min(255, Math.max(0, v))
+    }
+  }
+  return out
+}
+
+/**
+ * Decode the image at full resolution, reduce it like the server would and
+ * pack it as a raw uint8 tensor body for /predict, so the server can skip
+ * decoding and resizing. Also returns the original dimensions for the
+ * server's drift monitor.
+ */
+async function downscaleToTensor(file, size = UPLOAD_SIZE) {
+  const bitmap = await createImageBitmap(file)
+  const { width, height } = bitmap
+  const canvas = document.createElement('canvas')
+  canvas.width = width
+  canvas.height = height
+  const ctx = canvas.getContext('2d')
+  ctx.drawImage(bitmap, 0, 0) // 1:1, no resampling
+  bitmap.close?.()
+  const { data } = ctx.getImageData(0, 0, width, height)
+
+  const buf = new ArrayBuffer(RAW_HEADER_BYTES + size * size)
+  const header = new DataView(buf)
+  ;[...'uint8'].forEach((ch, i) => header.setUint8(i, ch.charCodeAt(0)))
+  header.setUint32(8, 1, true)
+  header.setUint32(12, size, true)
+  header.setUint32(16, size, true)
+  new Uint8Array(buf, RAW_HEADER_BYTES).set(
+    grayResizeLinear(data, width, height, size, size)
+  )
+  const blob = new Blob([buf], { type: 'application/octet-stream' })
+  return { blob, width, height }
+}
+
 function normLabel(s) {
   if (s == null) return ''
   return String(s)
@@ -499,13 +606,36 @@ predictBtn.addEventListener('click', async () => {
 
   const t0 = performance.now()
   try {
-    const formData = new FormData()
-    formData.append('file', file)
+    // With CLIENT_DOWNSCALE, send the reduced tensor; otherwise (or if the
+    // browser cannot decode the image onto a canvas) upload the file.
+    let body = null
+    let bytesSent = file.size
+    const headers = {}
+    if (CLIENT_DOWNSCALE) {
+      try {
+        const { blob, width, height } = await downscaleToTensor(file)
+        body = blob
+        bytesSent = blob.size
+        headers['X-Original-Size'] = `${width}x${height}`
+      } catch (e) {
+        body = null
+      }
+    }
+    if (!body) {
+      body = new FormData()
+      body.append('file', file)
+    }
+    const bytesSaved = Math.max(0, file.size - bytesSent)
+    fileMetaEl.textContent =
+      `${file.type || 'image'} • ${humanSize(file.size)}` +
+      (bytesSaved ? ` • sent ${humanSize(bytesSent)}` : '')
 
-    const resp = await fetch('/predict', { method: 'POST', body: formData })
+    const resp = await fetch('/predict', { method: 'POST', body, headers })
     if (!resp.ok) throw new Error(`HTTP ${resp.status}`)
 
-    const data = await resp.json()
+    // Tensor uploads answer with { threshold, predictions: [...] }
+    const raw = await resp.json()
+    const data = Array.isArray(raw.predictions) ? raw.predictions[0] : raw
 
     // Optional: keep raw JSON for debugging
     if (resultJson) resultJson.textContent = JSON.stringify(data, null, 2)
@@ -592,6 +722,8 @@ predictBtn.addEventListener('click', async () => {
       p_tumor_pct: pTumorPct ?? undefined,
       threshold_pct: thresholdPct ?? undefined,
       roundtrip_ms: clientMs,
+      bytes_sent: bytesSent,
+      bytes_saved: bytesSaved,
     })
 
     // If still ambiguous, show debug toggle
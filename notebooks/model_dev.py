@@ -50,8 +50,20 @@ no_tumor_dir = train_dir / "no_tumor"
 # print("Dir exists:", tumor_dir.exists())
 # print("Contents:", list(tumor_dir.iterdir())[:5])
 
-tumor_cases = list(tumor_dir.glob("*.jpg"))
-no_tumor_cases = list(no_tumor_dir.glob("*.jpg"))
+# Prefer the split manifest from training/build_splits.py over globbing
+manifest_path = Path("../data/manifest.csv")
+fold_of = {}  # image path -> k-fold id (manifest only)
+if manifest_path.exists():
+    import sys
+    sys.path.append("../training")
+    from manifest import read_manifest
+    train_rows = read_manifest(manifest_path, split="train")
+    tumor_cases = [r["path"] for r in train_rows if r["label"] == 1]
+    no_tumor_cases = [r["path"] for r in train_rows if r["label"] == 0]
+    fold_of = {r["path"]: r["fold"] for r in train_rows}
+else:
+    tumor_cases = list(tumor_dir.glob("*.jpg"))
+    no_tumor_cases = list(no_tumor_dir.glob("*.jpg"))
 
 print(f"Tumor Cases: {len(tumor_cases)}")
 print(f"No Tumor Cases: {len(no_tumor_cases)}")
@@ -235,9 +247,19 @@ print("Label distribution:", dict(zip(vals, cnts)))
 
 from sklearn.model_selection import train_test_split
 
-X_train, X_val, y_train, y_val = train_test_split(
-    X, y, test_size=0.20, stratify=y, random_state=42
-)
+VAL_FOLD = None  # set to a manifest fold id to validate on that fold
+
+if VAL_FOLD is not None:
+    assert VAL_FOLD in set(fold_of.values()), (
+        f"VAL_FOLD={VAL_FOLD} not in the manifest folds; "
+        "build it with training/build_splits.py --folds K")
+    is_val = train_data['image'].map(fold_of).eq(VAL_FOLD).values
+    X_train, X_val = X[~is_val], X[is_val]
+    y_train, y_val = y[~is_val], y[is_val]
+else:
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=0.20, stratify=y, random_state=42
+    )
 print("Train:", X_train.shape, " Val:", X_val.shape)
 
 
@@ -0,0 +1,211 @@
+import os
+import errno
+import shutil
+import argparse
+from pathlib import Path
+
+from sklearn.model_selection import StratifiedGroupKFold
+
+from dedup_index import (CACHE_PATH, EXTENSIONS, MAX_DISTANCE, find_clusters,
+                         hash_files)
+from manifest import LABELS, write_manifest
+
+# Builds the binary tumor / no_tumor split as a CSV manifest
+# (path, label, split, hash, fold) pointing at the original Kaggle files,
+# instead of copying every image into data/binary_split.
+
+# === SETTINGS ===
+SOURCE_DIR = "../input"                   # Kaggle Training/ + Testing/
+MANIFEST_PATH = "../data/manifest.csv"
+LINK_DIR = "../data/binary_split"         # only used with --materialize
+SOURCE_SPLITS = {"train": "Training", "test": "Testing"}
+TUMOR_LABELS = ["glioma", "meningioma", "pituitary"]
+NO_TUMOR_LABEL = "notumor"
+SEED = 42
+
+
+# === 1) Scan the original dataset ===
+def scan_source(source_dir):
+    rows = []
+    for split, folder in SOURCE_SPLITS.items():
+        for original in TUMOR_LABELS + [NO_TUMOR_LABEL]:
+            label_name = "no_tumor" if original == NO_TUMOR_LABEL else "tumor"
+            src = Path(source_dir) / folder / original
+            for path in sorted(src.glob("*")):
+                if path.is_file() and path.suffix.lower() in EXTENSIONS:
+                    rows.append({"path": path, "label": LABELS[label_name],
+                                 "split": split})
+    return rows
+
+
+# === 2) Split assignment ===
+def assign_groups(rows, max_distance):
+    """Give near-duplicate images (by perceptual hash) a shared group id.
+
+    Splits and folds are drawn per group, so copies of the same slice never
+    land on both sides. Groups are connected components and can chain into
+    one large group. Returns the number of multi-image groups and the size
+    of the largest one.
+    """
+    hashed = [i for i, r in enumerate(rows) if r["hash"]]
+    for i, r in enumerate(rows):
+        r["group"] = i
+    clusters = find_clusters([int(rows[i]["hash"], 16) for i in hashed],
+                             max_distance)
+    for c in clusters:
+        for i in c:
+            rows[hashed[i]]["group"] = rows[hashed[c[0]]]["group"]
+    return len(clusters), max(map(len, clusters), default=1)
+
+
+def test_splits(test_size):
+    """StratifiedGroupKFold splits whose single fold is the test part."""
+    return max(2, round(1 / test_size))
+
+
+def resplit(rows, test_size, seed):
+    """Pool all images and draw a fresh stratified, grouped train/test split.
+
+    The test part is one fold of a StratifiedGroupKFold, so its size is
+    1 / round(1 / test_size) of the data (e.g. 0.2 -> 5 folds).
+    """
+    n_splits = test_splits(test_size)
+    sgkf = StratifiedGroupKFold(n_splits=n_splits, shuffle=True,
+                                random_state=seed)
+    _, test_idx = next(sgkf.split(rows, [r["label"] for r in rows],
+                                  [r["group"] for r in rows]))
+    for r in rows:
+        r["split"] = "train"
+    for i in test_idx:
+        rows[i]["split"] = "test"
+    return rows
+
+
+def assign_folds(rows, k, seed):
+    """Stratified, grouped k-fold ids for the train rows; test rows get none."""
+    train = [r for r in rows if r["split"] == "train"]
+    sgkf = StratifiedGroupKFold(n_splits=k, shuffle=True, random_state=seed)
+    for fold, (_, val_idx) in enumerate(
+            sgkf.split(train, [r["label"] for r in train],
+                       [r["group"] for r in train])):
+        for i in val_idx:
+            train[i]["fold"] = fold
+
+
+def count_leaks(rows):
+    """Groups with members in more than one split."""
+    splits = {}
+    for r in rows:
+        splits.setdefault(r["group"], set()).add(r["split"])
+    return sum(len(s) > 1 for s in splits.values())
+
+
+# === 3) Optional folder view via hardlinks ===
+def materialize(rows, link_dir):
+    """Recreate {split}/{tumor,no_tumor}/ with hardlinks (no extra disk).
+
+    Each split folder is built next to the old one and swapped in, so files
+    from a previous split never linger. Files are named after their source
+    folders (``Training_glioma_x.jpg``), since source names are only unique
+    per folder, and a remaining clash is an error rather than an overwrite. Falls back to
+    copying only when source and target are on different devices.
+    """
+    names = {v: k for k, v in LABELS.items()}
+    link_dir = Path(link_dir)
+    for split in SOURCE_SPLITS:
+        tmp = link_dir / f".{split}.tmp"
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        for r in rows:
+            if r["split"] != split:
+                continue
+            src = r["path"]
+            name = f"{src.parent.parent.name}_{src.parent.name}_{src.name}"
+            dst = tmp / names[r["label"]] / name
+            if dst.exists():
+                raise FileExistsError(f"{src} and another image both map to "
+                                      f"{dst}")
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(src, dst)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.copy(src, dst)
+        tmp.mkdir(parents=True, exist_ok=True)
+        old = link_dir / split
+        if old.exists():
+            shutil.rmtree(old)
+        tmp.rename(old)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a manifest-based tumor / no_tumor split.")
+    parser.add_argument("--source-dir", default=SOURCE_DIR)
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--test-size", type=float, default=None,
+                        help="re-split with this test fraction instead of "
+                             "keeping Kaggle's Training/Testing split")
+    parser.add_argument("--folds", type=int, default=0,
+                        help="assign stratified, grouped k-fold ids to train rows")
+    parser.add_argument("--cache", default=CACHE_PATH)
+    parser.add_argument("--max-distance", type=int, default=MAX_DISTANCE,
+                        help="Hamming radius for grouping near-duplicates")
+    parser.add_argument("--materialize", metavar="DIR", nargs="?",
+                        const=LINK_DIR, default=None,
+                        help="also hardlink files into DIR/{split}/{label} "
+                             "(replaces DIR/train and DIR/test)")
+    args = parser.parse_args()
+    if args.test_size is not None and not 0 < args.test_size < 1:
+        parser.error("--test-size must be between 0 and 1 (exclusive)")
+
+    rows = scan_source(args.source_dir)
+    print(f"[PATH] SOURCE_DIR = {Path(args.source_dir).resolve()}")
+    if not rows:
+        raise SystemExit(f"No images found under {args.source_dir}")
+
+    hashes = hash_files([r["path"] for r in rows], args.cache)
+    for r in rows:
+        h = hashes[str(Path(r["path"]).resolve())]
+        r["hash"] = "" if h is None else f"{h:016x}"
+
+    n_groups, largest = assign_groups(rows, args.max_distance)
+    print(f"[GROUP] {n_groups} near-duplicate groups, largest {largest} "
+          f"(re-splits and folds keep each group together)")
+    # A group bigger than one fold can't be placed evenly and skews sizes.
+    limits = []
+    if args.test_size is not None:
+        limits.append(("the test split", len(rows) / test_splits(args.test_size)))
+    if args.folds > 1:
+        limits.append(("one fold", len(rows) / args.folds))
+    for what, limit in limits:
+        if largest > limit:
+            print(f"[WARN] largest group ({largest} images) exceeds "
+                  f"{what} ({limit:.0f} images); near-duplicates may have "
+                  f"chained, try a lower --max-distance")
+    if args.test_size is not None:
+        resplit(rows, args.test_size, args.seed)
+    if args.folds > 1:
+        assign_folds(rows, args.folds, args.seed)
+
+    write_manifest(rows, args.manifest)
+    print(f"[SAVED] {args.manifest}")
+    for split in SOURCE_SPLITS:
+        part = [r for r in rows if r["split"] == split]
+        tumor = sum(r["label"] for r in part)
+        print(f"  {split:5s}: {len(part):5d} images "
+              f"(tumor={tumor}, no_tumor={len(part) - tumor})")
+    leaks = count_leaks(rows)
+    if leaks:
+        print(f"[WARN] {leaks} near-duplicate groups span train and test "
+              f"(Kaggle's own split); use --test-size to re-split by group")
+
+    if args.materialize:
+        materialize(rows, args.materialize)
+        print(f"[LINKED] {Path(args.materialize).resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import tensorflow as tf
+import numpy as np
+import cv2
+from pathlib import Path
+
+# Checks that the web UI's client-side downscaling (static/index.js) keeps
+# predictions within tolerance of the full-size upload path, and reports
+# how many bytes each request saves. client_reduced() is a line-for-line
+# port of grayResizeLinear() in index.js; keep the two in sync. A recorded
+# run within tolerance is what allows CLIENT_DOWNSCALE = true in index.js.
+
+# === SETTINGS ===
+TEST_DIR = "../data/binary_split/test"
+MODEL_PATH = "../notebooks/api/model/brain_mri_model.h5"
+THRESHOLD = 0.05             # your locked threshold
+IMG_SIZE = (28, 28)
+UPLOAD_SIZES = [28, 56, 112]  # candidates; index.js ships UPLOAD_SIZE = 28
+RAW_HEADER_BYTES = 20        # raw tensor header, see README "API"
+MIN_AGREEMENT = 0.99         # fraction of labels that must match full-size
+MAX_ACC_DROP = 0.01          # allowed accuracy loss vs full-size
+BATCH_SIZE = 64
+OUT_DIR = "eval_final"
+
+# === 1) Load model ===
+model = tf.keras.models.load_model(MODEL_PATH, compile=False)
+print("[INFO] Model loaded.")
+
+
+# === 2) Helpers: both upload paths ===
+def server_full(img_gray):
+    """What app.py does with an original upload."""
+    return cv2.resize(img_gray, IMG_SIZE)
+
+
+def linear_taps(ssize, dsize, clamp_weights):
+    """cv2 INTER_LINEAR source indices + 11-bit weights (index.js linearTaps)."""
+    scale = 1 / (dsize / ssize)
+    taps = []
+    for d in range(dsize):
+        f = np.float32((d + 0.5) * scale - 0.5)
+        s = int(np.floor(f))
+        f = np.float32(f - s)
+        s1 = s + 1
+        if clamp_weights:
+            if s < 0:
+                s, f = 0, np.float32(0)
+            if s >= ssize - 1:
+                s, f = ssize - 1, np.float32(0)
+            s1 = min(s + 1, ssize - 1)
+        else:
+            s, s1 = min(max(s, 0), ssize - 1), min(max(s1, 0), ssize - 1)
+        taps.append((s, s1, int(np.rint((np.float32(1) - f) * 2048)),
+                     int(np.rint(f * 2048))))
+    return np.array(taps, dtype=np.int64).T
+
+
+def client_reduced(img_bgr, size):
+    """index.js grayResizeLinear() (luma + fixed-point INTER_LINEAR), then
+    the server fast path (no-op resize when size already matches the model)."""
+    b, g, r = (img_bgr[..., i].astype(np.int64) for i in range(3))
+    gray = (r * 9798 + g * 19235 + b * 3735 + 16384) >> 15
+    x0, x1, a0, a1 = linear_taps(gray.shape[1], size, True)
+    y0, y1, b0, b1 = linear_taps(gray.shape[0], size, False)
+    rows = gray[:, x0] * a0 + gray[:, x1] * a1
+    out = (((b0[:, None] * (rows[y0] >> 4)) >> 16)
+           + ((b1[:, None] * (rows[y1] >> 4)) >> 16) + 2) >> 2
+    small = np.clip(out, 0, 255).astype(np.uint8)
+    return small if small.shape == IMG_SIZE else cv2.resize(small, IMG_SIZE)
+
+
+def to_batch(imgs):
+    return (np.stack(imgs).astype("float32") / 255.0)[..., np.newaxis]
+
+
+# === 3) Load test images ===
+full, y, file_bytes, bgr = [], [], [], []
+for label_name, label_id in [("no_tumor", 0), ("tumor", 1)]:
+    for img_path in (Path(TEST_DIR) / label_name).glob("*"):
+        img = cv2.imread(str(img_path), cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        bgr.append(img)
+        full.append(server_full(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)))
+        file_bytes.append(img_path.stat().st_size)
+        y.append(label_id)
+y = np.array(y)
+file_bytes = np.array(file_bytes)
+print(f"[INFO] Loaded {len(y)} test images.")
+
+probs_full = model.predict(to_batch(full), batch_size=BATCH_SIZE,
+                           verbose=0).ravel()
+preds_full = (probs_full >= THRESHOLD).astype(int)
+acc_full = float((preds_full == y).mean())
+
+# === 4) Compare each candidate upload size against the full-size path ===
+results = {"threshold": THRESHOLD, "accuracy_full": acc_full,
+           "mean_original_bytes": float(file_bytes.mean()), "sizes": {}}
+print(f"\nFull-size accuracy: {acc_full:.4f}")
+print("Size  Agree   Acc     MaxDp   MeanDp  Sent(B)  Saved/req(B)  OK")
+ok_sizes = []
+for size in UPLOAD_SIZES:
+    reduced = [client_reduced(img, size) for img in bgr]
+    probs = model.predict(to_batch(reduced), batch_size=BATCH_SIZE,
+                          verbose=0).ravel()
+    preds = (probs >= THRESHOLD).astype(int)
+    diff = np.abs(probs - probs_full)
+    agree = float((preds == preds_full).mean())
+    acc = float((preds == y).mean())
+    sent = RAW_HEADER_BYTES + size * size
+    saved = float(np.maximum(file_bytes - sent, 0).mean())
+    ok = agree >= MIN_AGREEMENT and acc_full - acc <= MAX_ACC_DROP
+    if ok:
+        ok_sizes.append(size)
+    print(f"{size:4d}  {agree:6.3f}  {acc:6.4f}  {diff.max():6.4f}  "
+          f"{diff.mean():6.4f}  {sent:7d}  {saved:12.0f}  {'yes' if ok else 'NO'}")
+    results["sizes"][str(size)] = {
+        "label_agreement": agree, "accuracy": acc,
+        "max_abs_prob_diff": float(diff.max()),
+        "mean_abs_prob_diff": float(diff.mean()),
+        "bytes_sent": sent, "mean_bytes_saved_per_request": saved,
+        "within_tolerance": ok,
+    }
+
+# === 5) Save + exit status for CI ===
+os.makedirs(OUT_DIR, exist_ok=True)
+with open(Path(OUT_DIR) / "client_downscale.json", "w") as f:
+    json.dump(results, f, indent=2)
+print(f"\n[SAVED] {Path(OUT_DIR) / 'client_downscale.json'}")
+
+if UPLOAD_SIZES[0] not in ok_sizes:
+    print(f"[FAIL] Upload size {UPLOAD_SIZES[0]} is outside tolerance; "
+          f"sizes within tolerance: {ok_sizes or 'none'}")
+    sys.exit(1)
+print(f"[OK] Upload size {UPLOAD_SIZES[0]} matches the full-size path.")
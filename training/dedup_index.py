@@ -0,0 +1,342 @@
+import os
+import json
+import math
+import itertools
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from manifest import LABELS, read_manifest, write_manifest
+
+# Finds near-duplicate slices (perceptual hash + Hamming distance) within and
+# across the train/test splits, so leaked test images can't inflate the
+# numbers in eval_final.
+
+# === SETTINGS ===
+DATA_DIR = "../data/binary_split"
+CACHE_PATH = "dedup_cache.json"   # per-file hashes for incremental runs
+OUT_DIR = "eval_final"
+MAX_DISTANCE = 4                  # Hamming radius (bits out of 64)
+HASH_SIZE = 8                     # 8x8 difference hash -> 64 bits
+SPLITS = ["train", "test"]
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+# === 1) Perceptual hashing ===
+def dhash(path):
+    """64-bit difference hash of an image file, or None if unreadable."""
+    img = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    img = cv2.resize(img, (HASH_SIZE + 1, HASH_SIZE),
+                     interpolation=cv2.INTER_AREA)
+    bits = (img[:, 1:] > img[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hash_files(paths, cache_path=CACHE_PATH, workers=None):
+    """Hash ``paths`` in parallel, reusing cached hashes of unchanged files.
+
+    Returns {path_str: hash_int or None}. The cache is keyed by resolved path
+    and invalidated by size/mtime, so re-runs only hash new or edited files.
+    """
+    cache = {}
+    if cache_path and Path(cache_path).exists():
+        with open(cache_path) as f:
+            cache = json.load(f)
+
+    hashes, todo, stamps = {}, [], {}
+    for path in paths:
+        key = str(Path(path).resolve())
+        st = os.stat(key)
+        stamps[key] = [st.st_size, st.st_mtime_ns]
+        entry = cache.get(key)
+        if entry and entry[:2] == stamps[key]:
+            hashes[key] = None if entry[2] is None else int(entry[2], 16)
+        else:
+            todo.append(key)
+
+    print(f"[HASH] {len(paths)} files, {len(paths) - len(todo)} cached, "
+          f"{len(todo)} to hash")
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for key, h in zip(todo, pool.map(dhash, todo, chunksize=64)):
+                hashes[key] = h
+                cache[key] = stamps[key] + [None if h is None else f"{h:016x}"]
+        if cache_path:
+            with open(cache_path, "w") as f:
+                json.dump(cache, f)
+    return hashes
+
+
+# === 2) Multi-index hashing for Hamming-radius search ===
+class MultiIndexHash:
+    """Hamming-radius self-join over 64-bit hashes.
+
+    Each hash is split into ``m`` disjoint chunks of about log2(N) bits, so
+    an exact chunk bucket holds O(1) items on average. By pigeonhole, two
+    hashes within ``max_distance`` bits differ by at most
+    ``max_distance // m`` bits in at least one chunk; each chunk table is
+    probed with every key within that radius. Lookups are vectorised over
+    sorted chunk keys (a dense offset table for chunks up to DENSE_BITS,
+    ``searchsorted`` above that), and a pair is only emitted by the first
+    chunk that matches it, so no set of seen pairs is kept.
+    """
+
+    MAX_CANDIDATES = 1 << 22  # candidate pairs materialised per step
+    DENSE_BITS = 24           # offset table of 2**24 int32 = 64 MB max
+
+    def __init__(self, hashes, max_distance=MAX_DISTANCE, bits=HASH_SIZE ** 2):
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self.max_distance = max_distance
+        chunk_bits = max(1, round(math.log2(max(len(self.hashes), 2))))
+        n_chunks = min(bits, max(1, round(bits / chunk_bits)))
+        self.radius = max_distance // n_chunks
+        bounds = np.linspace(0, bits, n_chunks + 1).astype(int)
+        self.widths = [int(hi - lo) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        self.keys, self.order, self.sorted_keys = [], [], []
+        self.offsets = []
+        for lo, width in zip(bounds[:-1], self.widths):
+            keys = (self.hashes >> np.uint64(lo)) & np.uint64((1 << width) - 1)
+            order = np.argsort(keys, kind="stable")
+            self.keys.append(keys)
+            self.order.append(order)
+            self.sorted_keys.append(keys[order])
+            if width <= self.DENSE_BITS:
+                # offsets[key] .. offsets[key + 1] spans the key's bucket
+                counts = np.bincount(keys.astype(np.int64),
+                                     minlength=1 << width)
+                self.offsets.append(np.r_[0, np.cumsum(counts)]
+                                    .astype(np.int32))
+            else:
+                self.offsets.append(None)
+
+    def _lookup(self, k, probe):
+        """Start position and size of each probe's bucket in chunk ``k``."""
+        offsets = self.offsets[k]
+        if offsets is not None:
+            probe = probe.astype(np.int64)
+            left = offsets[probe].astype(np.int64)
+            return left, offsets[probe + 1] - left
+        left = np.searchsorted(self.sorted_keys[k], probe, "left")
+        return left, np.searchsorted(self.sorted_keys[k], probe, "right") - left
+
+    def _masks(self, width):
+        """XOR masks flipping up to ``self.radius`` of ``width`` bits."""
+        for d in range(self.radius + 1):
+            for bits in itertools.combinations(range(width), d):
+                yield np.uint64(sum(1 << b for b in bits))
+
+    def pairs(self):
+        """Yield (i, j) index arrays, i < j, of pairs within max_distance."""
+        n = len(self.hashes)
+        if n < 2:
+            return
+        for k, keys in enumerate(self.keys):
+            for mask in self._masks(self.widths[k]):
+                left, counts = self._lookup(k, keys ^ mask)
+                # Split the probes so each step expands a bounded number of
+                # candidates, even when a skewed bucket is large.
+                cum = np.cumsum(counts)
+                cuts = np.searchsorted(
+                    cum, np.arange(self.MAX_CANDIDATES, int(cum[-1]),
+                                   self.MAX_CANDIDATES), "right")
+                for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, n]):
+                    yield self._join(k, np.arange(lo, hi), left[lo:hi],
+                                     counts[lo:hi])
+
+    def _join(self, k, i, left, counts):
+        total = int(counts.sum())
+        starts = np.repeat(left - (np.cumsum(counts) - counts), counts)
+        j = self.order[k][starts + np.arange(total)]
+        i = np.repeat(i, counts)
+        keep = i < j
+        i, j = i[keep], j[keep]
+        for e in range(k):  # already emitted by an earlier chunk
+            near = np.bitwise_count(self.keys[e][i] ^ self.keys[e][j])
+            keep = near > self.radius
+            i, j = i[keep], j[keep]
+        dist = np.bitwise_count(self.hashes[i] ^ self.hashes[j])
+        keep = dist <= self.max_distance
+        return i[keep], j[keep]
+
+
+def _by_hash(hashes):
+    """{hash: item indices}; exact duplicates share one index entry."""
+    by_hash = defaultdict(list)
+    for i, h in enumerate(hashes):
+        by_hash[h].append(i)
+    return by_hash
+
+
+def find_clusters(hashes, max_distance=MAX_DISTANCE):
+    """Group item indices whose hashes are within ``max_distance``.
+
+    These are connected components, so they chain: A~B and B~C put A and C
+    together even when A and C are far apart. Use them to report leaks, not
+    to decide what to drop (see ``select_representatives``). Returns a list
+    of clusters (lists of indices) with >1 member.
+    """
+    by_hash = _by_hash(hashes)
+    unique = list(by_hash)
+
+    parent = list(range(len(unique)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for left, right in MultiIndexHash(unique, max_distance).pairs():
+        for i, j in zip(left.tolist(), right.tolist()):
+            parent[find(i)] = find(j)
+
+    groups = defaultdict(list)
+    for u, h in enumerate(unique):
+        groups[find(u)].extend(by_hash[h])
+    return [sorted(g) for g in groups.values() if len(g) > 1]
+
+
+def select_representatives(hashes, max_distance=MAX_DISTANCE, order=None):
+    """Greedy de-duplication: keep an item unless it is within
+    ``max_distance`` of an item already kept.
+
+    Items are visited in ``order`` (default: index order), so earlier items
+    win. Unlike ``find_clusters`` this doesn't chain: an item is only
+    dropped for being close to a kept one. Returns {kept index: [kept index,
+    then the indices it caused to be dropped]}.
+    """
+    by_hash = _by_hash(hashes)
+    unique = list(by_hash)
+    slot = {h: u for u, h in enumerate(unique)}
+    # Neighbours of each unique hash as CSR: near[start[u]:start[u + 1]]
+    left, right = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for i, j in MultiIndexHash(unique, max_distance).pairs():
+        left += [i, j]
+        right += [j, i]
+    left, right = np.concatenate(left), np.concatenate(right)
+    near = right[np.argsort(left, kind="stable")]
+    start = np.r_[0, np.cumsum(np.bincount(left, minlength=len(unique)))]
+
+    owner = np.full(len(unique), -1)  # first kept item within reach
+    groups = {}
+    for i in range(len(hashes)) if order is None else order:
+        u = slot[hashes[i]]
+        if owner[u] >= 0:
+            groups[int(owner[u])].append(i)
+            continue
+        groups[i] = [i]
+        owner[u] = i
+        reach = near[start[u]:start[u + 1]]
+        owner[reach[owner[reach] < 0]] = i
+    return groups
+
+
+# === 3) Dataset scan + report ===
+def scan_dataset(data_dir):
+    rows = []
+    for split in SPLITS:
+        for label_name, label_id in LABELS.items():
+            for path in sorted((Path(data_dir) / split / label_name).glob("*")):
+                if path.suffix.lower() in EXTENSIONS:
+                    rows.append({"path": path, "label": label_id,
+                                 "split": split})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report near-duplicate images and train/test leaks.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--from-manifest", default=None,
+                        help="read images/labels/splits from this manifest "
+                             "CSV instead of scanning --data-dir")
+    parser.add_argument("--cache", default=CACHE_PATH)
+    parser.add_argument("--out-dir", default=OUT_DIR)
+    parser.add_argument("--max-distance", type=int, default=MAX_DISTANCE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--manifest", default=None,
+                        help="write a de-duplicated manifest CSV here")
+    args = parser.parse_args()
+
+    if args.from_manifest:
+        rows = [{"path": r["path"], "label": r["label"], "split": r["split"]}
+                for r in read_manifest(args.from_manifest)]
+        print(f"[PATH] MANIFEST = {Path(args.from_manifest).resolve()}")
+    else:
+        rows = scan_dataset(args.data_dir)
+        print(f"[PATH] DATA_DIR = {Path(args.data_dir).resolve()}")
+    hashes = hash_files([r["path"] for r in rows], args.cache, args.workers)
+    for r in rows:
+        r["hash_int"] = hashes[str(Path(r["path"]).resolve())]
+    unreadable = [r for r in rows if r["hash_int"] is None]
+    rows = [r for r in rows if r["hash_int"] is not None]
+    for r in rows:
+        r["hash"] = f"{r['hash_int']:016x}"
+
+    hash_ints = [r["hash_int"] for r in rows]
+    clusters = find_clusters(hash_ints, args.max_distance)
+    leaks = [c for c in clusters if len({rows[i]["split"] for i in c}) > 1]
+    largest = max(map(len, clusters), default=1)
+
+    # Keep an image unless it is near one already kept, visiting test images
+    # first so the test set stays as close as possible to the original one.
+    # A kept image near a differently labelled one is dropped too: there is
+    # no trustworthy label to keep.
+    order = sorted(range(len(rows)), key=lambda i: rows[i]["split"] != "test")
+    groups = select_representatives(hash_ints, args.max_distance, order)
+    label_conflicts = [g for g in groups.values()
+                       if len({rows[i]["label"] for i in g}) > 1]
+    drop = {i for g in groups.values() for i in g[1:]}
+    drop.update(g[0] for g in label_conflicts)
+
+    print(f"\nImages hashed     : {len(rows)} ({len(unreadable)} unreadable)")
+    print(f"Duplicate clusters: {len(clusters)} "
+          f"({sum(len(c) for c in clusters)} images, largest {largest})")
+    print(f"Train/test leaks  : {len(leaks)} clusters")
+    print(f"Label conflicts   : {len(label_conflicts)} groups "
+          f"({sum(len(g) for g in label_conflicts)} images, all dropped)")
+    print(f"Would drop        : {len(drop)} images")
+
+    def describe(c):
+        return [{"path": str(rows[i]["path"]), "split": rows[i]["split"],
+                 "label": rows[i]["label"], "hash": rows[i]["hash"]}
+                for i in c]
+
+    report = {
+        "max_distance": args.max_distance,
+        "counts": {
+            "images": len(rows),
+            "unreadable": len(unreadable),
+            "clusters": len(clusters),
+            "largest_cluster": largest,
+            "leak_clusters": len(leaks),
+            "label_conflict_groups": len(label_conflicts),
+            "dropped": len(drop),
+        },
+        "manifest_policy": ("greedy: keep an image unless it is within "
+                            "max_distance of one already kept, test split "
+                            "first; a kept image near a different label is "
+                            "excluded with its near-duplicates"),
+        "label_conflicts": [describe(c) for c in label_conflicts],
+        "leaks": [describe(c) for c in leaks],
+        "clusters": [describe(c) for c in clusters],
+    }
+    os.makedirs(args.out_dir, exist_ok=True)
+    with open(Path(args.out_dir) / "duplicates.json", "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[SAVED] {Path(args.out_dir) / 'duplicates.json'}")
+
+    if args.manifest:
+        write_manifest([r for i, r in enumerate(rows) if i not in drop],
+                       args.manifest)
+        print(f"[SAVED] {args.manifest}")
+
+
+if __name__ == "__main__":
+    main()
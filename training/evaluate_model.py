@@ -5,6 +5,7 @@ import tensorflow as tf
 import numpy as np
 import cv2
 from pathlib import Path
+from manifest import read_manifest
 from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score,
     confusion_matrix, roc_auc_score, average_precision_score
@@ -12,14 +13,34 @@ from sklearn.metrics import (
 
 # === SETTINGS ===
 TEST_DIR = "../data/binary_split/test"
+MANIFEST_PATH = "../data/manifest.csv"  # used instead of TEST_DIR if present
 MODEL_PATH = "../notebooks/api/model/brain_mri_model.h5"
 THRESHOLD = 0.05             # your locked threshold
 IMG_SIZE = (28, 28)
 BATCH_SIZE = 64
 OUT_DIR = "eval_final"     # where to save outputs
+# Reference profile for the API's drift monitor (/drift); it is also copied
+# next to the model so the API picks it up by default.
+PROFILE_NAME = "reference_profile.json"
+DRIFT_BINS = {
+    "probability_tumor": np.linspace(0.0, 1.0, 21),
+    "label_id": np.array([0.0, 0.5, 1.0]),
+    "mean_intensity": np.linspace(0.0, 1.0, 21),
+    "std_intensity": np.linspace(0.0, 0.5, 21),
+    "mean_intensity_reduced": np.linspace(0.0, 1.0, 21),
+    "std_intensity_reduced": np.linspace(0.0, 0.5, 21),
+    "height": np.array([0, 64, 128, 192, 256, 320, 384, 448, 512,
+                        640, 768, 1024, 2048], dtype=float),
+    "width": np.array([0, 64, 128, 192, 256, 320, 384, 448, 512,
+                       640, 768, 1024, 2048], dtype=float),
+}
 
 # === 0) Path sanity prints (optional but helpful) ===
-print("[PATH] TEST_DIR  =", Path(TEST_DIR).resolve())
+use_manifest = Path(MANIFEST_PATH).exists()
+if use_manifest:
+    print("[PATH] MANIFEST  =", Path(MANIFEST_PATH).resolve())
+else:
+    print("[PATH] TEST_DIR  =", Path(TEST_DIR).resolve())
 print("[PATH] MODEL     =", Path(MODEL_PATH).resolve())
 
 # === 1) Load model ===
@@ -27,23 +48,38 @@ model = tf.keras.models.load_model(MODEL_PATH, compile=False)
 print("[INFO] Model loaded.")
 
 # === 2) Helper: load images & labels ===
-def load_data(folder):
-    X, y = [], []
+def list_folder(folder):
+    """(path, label) pairs from the {no_tumor,tumor}/ folder layout."""
+    items = []
     for label_name, label_id in [("no_tumor", 0), ("tumor", 1)]:
-        path = Path(folder) / label_name
-        for img_path in path.glob("*"):
-            img = cv2.imread(str(img_path), cv2.IMREAD_GRAYSCALE)
-            if img is None:
-                continue
-            img = cv2.resize(img, IMG_SIZE)           # Resize
-            img = img.astype("float32") / 255.0       # Normalize
-            img = np.expand_dims(img, axis=-1)        # Shape: (28,28,1)
-            X.append(img)
-            y.append(label_id)
-    return np.array(X), np.array(y)
+        items += [(p, label_id) for p in (Path(folder) / label_name).glob("*")]
+    return items
+
+def load_data(items):
+    X, y, dims, reduced = [], [], [], []
+    for img_path, label_id in items:
+        img = cv2.imread(str(img_path), cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            continue
+        dims.append(img.shape)                    # original (H, W)
+        # Intensity stats of an area-averaged client upload
+        # (X-Client-Resample: area), for the drift reference only
+        small = cv2.resize(img, IMG_SIZE, interpolation=cv2.INTER_AREA) / 255.0
+        reduced.append((small.mean(), small.std()))
+        img = cv2.resize(img, IMG_SIZE)           # Resize
+        img = img.astype("float32") / 255.0       # Normalize
+        img = np.expand_dims(img, axis=-1)        # Shape: (28,28,1)
+        X.append(img)
+        y.append(label_id)
+    return np.array(X), np.array(y), np.array(dims), np.array(reduced)
 
 # === 3) Load test data ===
-X_test, y_test = load_data(TEST_DIR)
+if use_manifest:
+    test_items = [(r["path"], r["label"])
+                  for r in read_manifest(MANIFEST_PATH, split="test")]
+else:
+    test_items = list_folder(TEST_DIR)
+X_test, y_test, dims_test, reduced_test = load_data(test_items)
 print(f"[INFO] Loaded {len(X_test)} test images.")
 
 # === 4) Predict in batches to save RAM ===
@@ -166,3 +202,38 @@ with open(Path(OUT_DIR) / "results.md", "w", encoding="utf-8") as f:
 
 print(f"\n[SAVED] {Path(OUT_DIR) / 'metrics.json'}")
 print(f"[SAVED] {Path(OUT_DIR) / 'results.md'}")
+
+# === 8) Reference profile for drift monitoring ===
+# Same binning as DriftMonitor in app.py: out-of-range values are clipped
+# into the first/last bin instead of dropped. Intensity stats are kept per
+# input path: server-resized inputs vs. uploads the client area-averaged.
+def bin_counts(values, edges):
+    idx = np.clip(np.searchsorted(edges, values, side="right") - 1,
+                  0, len(edges) - 2)
+    return np.bincount(idx, minlength=len(edges) - 1)
+
+features = {
+    "probability_tumor": probs,
+    "label_id": preds,
+    "mean_intensity": X_test.mean(axis=(1, 2, 3)),
+    "std_intensity": X_test.std(axis=(1, 2, 3)),
+    "mean_intensity_reduced": reduced_test[:, 0],
+    "std_intensity_reduced": reduced_test[:, 1],
+    "height": dims_test[:, 0],
+    "width": dims_test[:, 1],
+}
+profile = {
+    "timestamp": timestamp,
+    "threshold": THRESHOLD,
+    "count": int(len(y_test)),
+    "features": {
+        name: {"edges": DRIFT_BINS[name].tolist(),
+               "counts": bin_counts(values, DRIFT_BINS[name]).tolist()}
+        for name, values in features.items()
+    }
+}
+for profile_path in [Path(OUT_DIR) / PROFILE_NAME,
+                     Path(MODEL_PATH).parent / PROFILE_NAME]:
+    with open(profile_path, "w") as f:
+        json.dump(profile, f, indent=2)
+    print(f"[SAVED] {profile_path}")
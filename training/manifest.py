@@ -0,0 +1,45 @@
+"""Dataset manifests: one CSV row per image instead of a folder layout.
+
+Paths are stored relative to the manifest's own directory so a manifest can
+be moved together with the data it describes.
+"""
+import os
+import csv
+from pathlib import Path
+
+MANIFEST_FIELDS = ["path", "label", "split", "hash", "fold"]
+LABELS = {"no_tumor": 0, "tumor": 1}
+
+
+def write_manifest(rows, manifest_path):
+    """Write dict rows to a CSV manifest; a missing ``fold`` is left blank."""
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    root = manifest_path.parent.resolve()
+    with open(manifest_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS,
+                                extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            path = Path(row["path"]).resolve()
+            try:
+                path = Path(os.path.relpath(path, root))
+            except ValueError:
+                pass  # different drive (Windows): keep absolute
+            writer.writerow({**row, "path": path.as_posix()})
+
+
+def read_manifest(manifest_path, split=None):
+    """Read a manifest, resolving paths; optionally keep one split only."""
+    manifest_path = Path(manifest_path)
+    root = manifest_path.parent
+    rows = []
+    with open(manifest_path, newline="") as f:
+        for row in csv.DictReader(f):
+            if split is not None and row["split"] != split:
+                continue
+            row["path"] = root / row["path"]
+            row["label"] = int(row["label"])
+            row["fold"] = int(row["fold"]) if row.get("fold") else None
+            rows.append(row)
+    return rows
@@ -4,6 +4,9 @@ from pathlib import Path
 test_dir = Path("../data/binary_split/test")  # your test dir
 # your model path
 model_path = Path("../notebooks/api/model/brain_mri_model.h5")
+# split manifest from build_splits.py (used instead of the folders if present)
+manifest_path = Path("../data/manifest.csv")
 
 print("Test dir exists? ", test_dir.exists())
 print("Model file exists? ", model_path.exists())
+print("Manifest exists? ", manifest_path.exists())